@@ -0,0 +1,29 @@
+import json
+import os
+from trusted_advisor.engine import CATEGORIES, run_report
+from trusted_advisor.events import EVENT_DRIVEN, handle_event
+from trusted_advisor.reporters import get_reporters
+
+# Set ORGANIZATION_MODE=1 to report on every member account of the organization
+ORGANIZATION_MODE = os.environ.get('ORGANIZATION_MODE', '').lower() in ('1', 'true', 'yes')
+
+# Main function. CATEGORIES is a comma separated list of Trusted Advisor
+# categories, all of them by default. In event driven mode the event is a
+# Trusted Advisor refresh event (or a batch of them) or the scheduled digest
+# trigger; event driven mode covers the Lambda's own account only.
+def get_all_recommendations(event=None):
+    categories = os.environ.get('CATEGORIES', ','.join(CATEGORIES)).split(',')
+    reporters = get_reporters([category.strip() for category in categories if category.strip()])
+    if EVENT_DRIVEN:
+        return handle_event(reporters, event)
+    if ORGANIZATION_MODE:
+        from trusted_advisor.organizations import run_organization_report
+        return run_organization_report(reporters)
+    return run_report(reporters)
+
+def lambda_handler(event, context):
+    get_all_recommendations(event)
+    return {
+        'statusCode': 200,
+        'body': json.dumps('Hello from Lambda!')
+    }
@@ -0,0 +1,259 @@
+"""Offline benchmark of the Trusted Advisor report pipeline.
+
+Runs the catalog, fetch, render and delivery phases against a local fake of
+the Support and SES APIs with simulated latency, so no credentials or network
+are needed. Each scenario runs in its own process so its peak RSS is its own.
+
+    python benchmarks/benchmark.py                   # run and compare with baseline.json
+    python benchmarks/benchmark.py --save-baseline   # run and store the results as the baseline
+    python benchmarks/benchmark.py --scenarios small --latency-ms 0
+
+The comparison fails (exit status 1) when a metric is more than --tolerance
+worse than the baseline, and when there is no baseline to compare with. Baselines are machine specific; save one on the
+machine that runs the comparison.
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# name: (number of checks, flagged resources per check)
+SCENARIOS = {
+    'small': (5, 10),
+    'medium': (50, 100),
+    'large': (300, 100),
+}
+
+# Metrics where a higher value is better; every other metric is lower-is-better
+HIGHER_IS_BETTER = ('resources_per_second',)
+
+CATEGORIES = ('cost_optimizing', 'security', 'fault_tolerance', 'performance', 'service_limits')
+COLUMNS = ['Status', 'Region', 'Resource', 'Instance Type', 'Reason', 'Estimated Monthly Savings']
+DESCRIPTION = "Checks for resources that can be improved.<h4 class='headerBodyStyle'>Alert Criteria</h4>Yellow: ..." * 3
+
+
+# Fake Support client serving a synthetic catalog, with latency per call
+class FakeSupport:
+    def __init__(self, checks, resources_per_check, latency):
+        self.latency = latency
+        self.resources_per_check = resources_per_check
+        self.checks = checks
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def describe_trusted_advisor_checks(self, language):
+        self.wait()
+        return {'checks': self.checks}
+
+    def describe_trusted_advisor_check_summaries(self, checkIds):
+        self.wait()
+        return {'summaries': [{
+            'checkId': check_id,
+            'status': 'warning',
+            'hasFlaggedResources': True,
+            'timestamp': '2024-01-01T00:00:00Z',
+            'resourcesSummary': {'resourcesFlagged': self.resources_per_check},
+        } for check_id in checkIds]}
+
+    def describe_trusted_advisor_check_result(self, checkId):
+        self.wait()
+        rng = random.Random(checkId)
+        return {'result': {
+            'checkId': checkId,
+            'timestamp': '2024-01-01T00:00:00Z',
+            'flaggedResources': [{
+                'resourceId': f"{checkId}-{index}",
+                'status': 'warning',
+                'region': 'us-east-1',
+                'metadata': ['Yellow', 'us-east-1', f"arn:aws:ec2:us-east-1:123456789012:instance/i-{index:017x}",
+                             'm5.large', 'Low utilization <10%', f"${rng.uniform(1, 500):,.2f}"],
+            } for index in range(self.resources_per_check)],
+        }}
+
+
+# Fake SES client that only measures what would be sent
+class FakeSES:
+    def __init__(self, latency):
+        self.latency = latency
+        self.bytes_sent = 0
+
+    def send_email(self, **kwargs):
+        time.sleep(self.latency)
+        self.bytes_sent += len(kwargs['Message']['Body']['Html']['Data'])
+        return {'MessageId': 'benchmark'}
+
+    def send_raw_email(self, **kwargs):
+        time.sleep(self.latency)
+        self.bytes_sent += len(kwargs['RawMessage']['Data'])
+        return {'MessageId': 'benchmark'}
+
+
+# Function to build a synthetic catalog. The first checks of the cost and
+# security categories reuse real check names so their table layouts are used.
+def build_catalog(check_count):
+    from trusted_advisor.reporters import REPORTERS
+    named = {category: list(reporter.layouts or {}) for category, reporter in REPORTERS.items()}
+    checks = []
+    for index in range(check_count):
+        category = CATEGORIES[index % len(CATEGORIES)]
+        names = named[category]
+        name = names.pop(0) if names else f"Synthetic {category} check {index}"
+        checks.append({
+            'id': f"check{index:05d}",
+            'name': name,
+            'category': category,
+            'description': DESCRIPTION,
+            'metadata': COLUMNS,
+        })
+    return checks
+
+
+# Function to run one scenario in this process and return its metrics
+def run_scenario(name, latency_ms):
+    os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+    os.environ.update(CACHE_ENABLED='0', DELTA_REPORTS='0', REFRESH_CHECKS='0', FROM_ADDRESS='from@example.com')
+    sys.path.insert(0, ROOT)
+    from trusted_advisor import engine
+    from trusted_advisor.clients import clients
+    from trusted_advisor.delivery import deliver_report
+    from trusted_advisor.reporters import get_reporters
+
+    check_count, resources_per_check = SCENARIOS[name]
+    latency = latency_ms / 1000
+    ses = FakeSES(latency)
+    clients.update(support=FakeSupport(build_catalog(check_count), resources_per_check, latency), ses=ses)
+    reporters = get_reporters(CATEGORIES)
+
+    phases = {}
+    start = time.perf_counter()
+    checks = engine.get_trusted_advisor_checks(CATEGORIES)
+    phases['catalog_ms'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    recommendations = engine.get_trusted_advisor_recommendations(checks)
+    phases['fetch_ms'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    html_table, _ = engine.render_report(reporters, checks, recommendations, 'snapshot/benchmark')
+    phases['render_ms'] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    deliver_report(engine.report_subject(reporters), html_table, ['to@example.com'], recommendations)
+    phases['deliver_ms'] = (time.perf_counter() - start) * 1000
+
+    total_ms = sum(phases.values())
+    return dict(
+        phases,
+        total_ms=total_ms,
+        resources=len(recommendations),
+        resources_per_second=len(recommendations) / (total_ms / 1000),
+        report_bytes=len(html_table),
+        peak_rss_mb=resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    )
+
+
+# Function to measure the cold start of a handler module in a fresh interpreter:
+# importing it and creating the Support and SES clients
+def measure_cold_start():
+    code = (
+        "import time; start = time.perf_counter()\n"
+        "import importlib.util, sys\n"
+        f"sys.path.insert(0, {ROOT!r})\n"
+        f"spec = importlib.util.spec_from_file_location('lambda_function', {os.path.join(ROOT, 'all_categories', 'lambda_function.py')!r})\n"
+        "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+        "imported = time.perf_counter()\n"
+        "from trusted_advisor.engine import get_client\n"
+        "get_client('support'); get_client('ses')\n"
+        "print((imported - start) * 1000, (time.perf_counter() - start) * 1000)\n"
+    )
+    env = dict(os.environ, AWS_DEFAULT_REGION=os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'))
+    output = subprocess.run([sys.executable, '-c', code], env=env, check=True, capture_output=True, text=True).stdout
+    import_ms, total_ms = (float(value) for value in output.split())
+    return {'import_ms': import_ms, 'total_ms': total_ms}
+
+
+# Function to run every requested scenario in its own process
+def run_all(scenarios, latency_ms):
+    results = {'cold_start': measure_cold_start()}
+    for name in scenarios:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-scenario', name, '--latency-ms', str(latency_ms)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results[name] = json.loads(output)
+    return results
+
+
+# Function to compare results with the baseline, returning the regressions
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            if not before or metric in ('resources', 'report_bytes'):
+                continue
+            if metric in HIGHER_IS_BETTER:
+                worse = value < before * (1 - tolerance)
+            else:
+                worse = value > before * (1 + tolerance)
+            if worse:
+                regressions.append(f"{name}.{metric}: {before:.1f} -> {value:.1f}")
+    return regressions
+
+
+def print_results(results):
+    for name, metrics in results.items():
+        print(name)
+        for metric, value in metrics.items():
+            print(f"  {metric:<22} {value:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--latency-ms', type=float, default=20, help="simulated latency of every API call")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before a metric counts as a regression")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--run-scenario', choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scenario:
+        print(json.dumps(run_scenario(args.run_scenario, args.latency_ms)))
+        return 0
+
+    # Without a baseline there is nothing to compare with, so fail before running
+    # rather than reporting success
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        return 1
+
+    results = run_all(args.scenarios, args.latency_ms)
+    print_results(results)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    if regressions:
+        print("REGRESSIONS:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("No regressions against the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
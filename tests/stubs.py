@@ -0,0 +1,115 @@
+import os
+import time
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('FROM_ADDRESS', 'reports@example.com')
+os.environ.setdefault('TO_ADDRESS', 'team@example.com')
+
+from trusted_advisor import clients, engine
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'samples')
+
+CHECKS = [
+    {
+        'id': 'hjLMh88uM8',
+        'name': 'Idle Load Balancers',
+        'category': 'cost_optimizing',
+        'description': "Checks for idle load balancers.<h4 class='headerBodyStyle'>Alert Criteria</h4>Yellow: ...",
+        'metadata': ['Region', 'Load Balancer Name', 'Reason', 'Estimated Monthly Savings'],
+    },
+    {
+        'id': 'ePs02jT06w',
+        'name': 'Amazon EBS Public Snapshots',
+        'category': 'security',
+        'description': "Checks the permission settings for your EBS snapshots.",
+        'metadata': ['Status', 'Region', 'Volume ID', 'Snapshot ID', 'Description'],
+    },
+    {
+        'id': 'R365s2Qddf',
+        'name': 'Amazon S3 Bucket Versioning',
+        'category': 'fault_tolerance',
+        'description': "Checks for Amazon S3 buckets that do not have versioning enabled.",
+        'metadata': ['Region', 'Bucket Name', 'Versioning', 'Status'],
+    },
+]
+
+# Support client stub serving CHECKS with flagged_per_check resources each
+class StubSupport:
+    def __init__(self, flagged_per_check=2, timestamp='2024-05-06T07:00:00Z'):
+        self.flagged_per_check = flagged_per_check
+        self.timestamp = timestamp
+        self.calls = []
+
+    def describe_trusted_advisor_checks(self, language):
+        self.calls.append(('checks',))
+        return {'checks': CHECKS}
+
+    def describe_trusted_advisor_check_summaries(self, checkIds):
+        self.calls.append(('summaries', tuple(checkIds)))
+        return {'summaries': [{
+            'checkId': check_id,
+            'status': 'warning',
+            'timestamp': self.timestamp,
+            'hasFlaggedResources': True,
+            'resourcesSummary': {'resourcesFlagged': self.flagged_per_check},
+        } for check_id in checkIds]}
+
+    def describe_trusted_advisor_check_result(self, checkId):
+        self.calls.append(('result', checkId))
+        check = next(check for check in CHECKS if check['id'] == checkId)
+        return {'result': {
+            'checkId': checkId,
+            'timestamp': self.timestamp,
+            'flaggedResources': [{
+                'resourceId': f"{checkId}-{index}",
+                'status': 'warning',
+                'region': 'us-east-1',
+                'metadata': [f"{column} {index}" for column in check['metadata'][:-1]] + [f"${index + 1}.00"],
+            } for index in range(self.flagged_per_check)],
+        }}
+
+# SES client stub keeping the messages it is asked to send
+class StubSES:
+    def __init__(self):
+        self.sent = []
+
+    def send_email(self, **kwargs):
+        self.sent.append(kwargs)
+        return {'MessageId': str(len(self.sent))}
+
+    def send_raw_email(self, **kwargs):
+        self.sent.append(kwargs)
+        return {'MessageId': str(len(self.sent))}
+
+# Organizations client stub listing the given accounts
+class StubOrganizations:
+    def __init__(self, accounts):
+        self.accounts = accounts
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self):
+        return [{'Accounts': [{'Id': account_id, 'Name': name, 'Status': 'ACTIVE'} for account_id, name in self.accounts]}]
+
+# Cache kept in memory, with the interface of cache.TieredCache
+class MemoryCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry[1]
+
+    def put(self, key, value, ttl):
+        self.entries[key] = (time.time() + ttl, value)
+
+# Function to install stub Support and SES clients and an empty memory cache
+def install_stubs(support=None):
+    support = support or StubSupport()
+    ses = StubSES()
+    clients.clients.update(support=support, ses=ses)
+    engine.cache = MemoryCache()
+    return support, ses
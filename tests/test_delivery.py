@@ -0,0 +1,43 @@
+import email
+import unittest
+from unittest import mock
+
+from tests.stubs import StubSupport, install_stubs
+from trusted_advisor import delivery, engine
+
+
+class DeliverReportTest(unittest.TestCase):
+    def setUp(self):
+        self.support, self.ses = install_stubs(StubSupport(flagged_per_check=400))
+        checks = engine.get_trusted_advisor_checks(['cost_optimizing', 'security', 'fault_tolerance'])
+        self.recommendations = engine.get_trusted_advisor_recommendations(checks, refresh=False)
+        self.html_table = ''.join(
+            f"<h3>{rec.check_name}</h3><p>{rec.resource_id} {' '.join(rec.metadata)}</p>"
+            for rec in self.recommendations
+        )
+
+    def attachments(self):
+        for sent in self.ses.sent:
+            message = email.message_from_bytes(sent['RawMessage']['Data'])
+            yield sent, {part.get_filename(): part.get_payload(decode=True) for part in message.walk() if part.get_filename()}
+
+    def test_split_report_and_csv_stay_under_the_attachment_limit(self):
+        limit = len(delivery.recommendations_csv(self.recommendations)) + 1024
+        with mock.patch.object(delivery, 'INLINE_REPORT_MAX_BYTES', 1024), mock.patch.object(delivery, 'ATTACHMENT_MAX_BYTES', limit):
+            responses = delivery.deliver_report("Report", self.html_table, ['team@example.com'], self.recommendations)
+
+        self.assertGreater(len(responses), 2)
+        messages = list(self.attachments())
+        for sent, attachments in messages:
+            self.assertEqual(len(attachments), 1)
+            self.assertLessEqual(sum(len(data) for data in attachments.values()), limit)
+        self.assertEqual(list(messages[-1][1]), ['flagged_resources.csv.gz'])
+
+    def test_small_report_is_sent_inline(self):
+        responses = delivery.deliver_report("Report", "<h3>Check</h3>", ['team@example.com'], self.recommendations)
+        self.assertEqual(len(responses), 1)
+        self.assertEqual(self.ses.sent[0]['Message']['Body']['Html']['Data'], "<h3>Check</h3>")
+
+
+if __name__ == '__main__':
+    unittest.main()
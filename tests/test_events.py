@@ -0,0 +1,79 @@
+import contextlib
+import io
+import json
+import os
+import unittest
+from unittest import mock
+
+from tests.stubs import SAMPLES_DIR, install_stubs
+from trusted_advisor import engine, metrics
+from trusted_advisor.events import handle_event, parse_refresh_events
+from trusted_advisor.reporters import get_reporters
+
+
+def load_sample(name):
+    with open(os.path.join(SAMPLES_DIR, name)) as f:
+        return json.load(f)
+
+
+class ParseRefreshEventsTest(unittest.TestCase):
+    def test_single_event(self):
+        events = parse_refresh_events(load_sample('check_item_refresh_event.json'))
+        self.assertEqual([event['detail']['check-name'] for event in events], ['Idle Load Balancers'])
+
+    def test_sqs_batch(self):
+        events = parse_refresh_events(load_sample('check_item_refresh_sqs_batch.json'))
+        self.assertEqual(
+            [event['detail']['check-name'] for event in events],
+            ['Idle Load Balancers', 'Amazon EBS Public Snapshots']
+        )
+
+    def test_sqs_batch_skips_bodies_that_are_not_json(self):
+        batch = load_sample('check_item_refresh_sqs_batch.json')
+        batch['Records'].insert(0, {'messageId': 'bad', 'body': 'not json'})
+        self.assertEqual(len(parse_refresh_events(batch)), 2)
+
+
+class HandleEventTest(unittest.TestCase):
+    def setUp(self):
+        self.support, self.ses = install_stubs()
+        self.reporters = get_reporters(['cost_optimizing', 'security'])
+
+    def test_refresh_event_updates_only_its_check(self):
+        updated = handle_event(self.reporters, load_sample('check_item_refresh_event.json'))
+
+        self.assertEqual(updated, ['hjLMh88uM8'])
+        self.assertIn(('result', 'hjLMh88uM8'), self.support.calls)
+        self.assertNotIn(('result', 'ePs02jT06w'), self.support.calls)
+        self.assertIn('state/hjLMh88uM8', engine.cache.entries)
+        self.assertNotIn('state/ePs02jT06w', engine.cache.entries)
+        self.assertEqual(self.ses.sent, [])
+
+    def test_refresh_metrics_are_labelled_with_check_names(self):
+        out = io.StringIO()
+        with mock.patch.object(metrics, 'METRICS_ENABLED', True), contextlib.redirect_stdout(out):
+            handle_event(self.reporters, load_sample('check_item_refresh_event.json'))
+
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        check_names = [line['CheckName'] for line in lines if 'CheckName' in line]
+        self.assertEqual(check_names, ['Idle Load Balancers'])
+
+    def test_digest_is_built_from_the_state(self):
+        handle_event(self.reporters, load_sample('check_item_refresh_sqs_batch.json'))
+        self.support.calls.clear()
+
+        html_table = handle_event(self.reporters, {'source': 'aws.events', 'detail-type': 'Scheduled Event'})
+
+        self.assertEqual(len(self.ses.sent), 1)
+        self.assertIn("Idle Load Balancers", html_table)
+        self.assertIn("Amazon EBS Public Snapshots", html_table)
+        # Every check has state, so the digest makes no Support API calls beyond the cached catalog
+        self.assertEqual(self.support.calls, [])
+
+    def test_other_events_are_ignored(self):
+        self.assertIsNone(handle_event(self.reporters, {'source': 'aws.s3', 'detail-type': 'Object Created'}))
+        self.assertEqual(self.ses.sent, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
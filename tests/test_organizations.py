@@ -0,0 +1,58 @@
+import threading
+import unittest
+
+from tests.stubs import StubOrganizations, StubSupport, install_stubs
+from trusted_advisor.organizations import run_organization_report
+from trusted_advisor.reporters import get_reporters
+
+ACCOUNTS = [('111111111111', 'production'), ('222222222222', 'broken'), ('333333333333', 'slow')]
+
+
+class RunOrganizationReportTest(unittest.TestCase):
+    def setUp(self):
+        self.support, self.ses = install_stubs()
+        self.release = threading.Event()
+
+    def tearDown(self):
+        # Let the timed out worker finish so the interpreter can exit
+        self.release.set()
+
+    def client_factory(self, account_id):
+        if account_id == '222222222222':
+            raise RuntimeError("AccessDenied assuming TrustedAdvisorReadOnly")
+        if account_id == '333333333333':
+            self.release.wait(10)
+        return StubSupport()
+
+    def run_report(self):
+        return run_organization_report(
+            get_reporters(['cost_optimizing', 'security']),
+            to_addresses=['team@example.com'],
+            organizations_client=StubOrganizations(ACCOUNTS),
+            client_factory=self.client_factory,
+            timeout=0.5
+        )
+
+    def test_failing_and_timed_out_accounts_do_not_stop_the_report(self):
+        html_table = self.run_report()
+
+        self.assertEqual(len(self.ses.sent), 1)
+        self.assertIn("Account 111111111111 (production)", html_table)
+        self.assertIn("Idle Load Balancers", html_table)
+        self.assertIn("Amazon EBS Public Snapshots", html_table)
+        self.assertNotIn("Account 222222222222", html_table)
+        self.assertNotIn("Account 333333333333", html_table)
+
+        failures = html_table[html_table.index("Accounts that could not be checked"):]
+        self.assertIn("222222222222", failures)
+        self.assertIn("AccessDenied assuming TrustedAdvisorReadOnly", failures)
+        self.assertIn("333333333333", failures)
+        self.assertIn("Timed out after 0 seconds", failures)
+
+    def test_catalog_is_read_once_from_the_management_account(self):
+        self.run_report()
+        self.assertEqual(self.support.calls, [('checks',)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from trusted_advisor.startup import lazy_import
+
+# Cache for the check catalog and check results. Entries are gzipped JSON with
+# an expiry time, kept in a local directory (/tmp survives warm invocations)
+# and optionally in an S3 compatible bucket shared by every invocation.
+CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CACHE_DIR = os.environ.get('CACHE_DIR', '/tmp/trusted_advisor_cache')
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+CACHE_S3_BUCKET = os.environ.get('CACHE_S3_BUCKET')
+CACHE_S3_PREFIX = os.environ.get('CACHE_S3_PREFIX', 'trusted-advisor-cache/')
+CACHE_S3_ENDPOINT_URL = os.environ.get('CACHE_S3_ENDPOINT_URL')
+
+logger = logging.getLogger()
+
+# Function to serialize a cache entry ({'expires': epoch seconds, 'value': ...})
+def dump_entry(entry):
+    return gzip.compress(json.dumps(entry).encode('utf-8'))
+
+# Function to deserialize a cache entry, returning None once it has expired
+def load_entry(data):
+    entry = json.loads(gzip.decompress(data))
+    if entry['expires'] < time.time():
+        return None
+    return entry
+
+# Cache stored as files in a local directory. Once the directory grows past
+# max_bytes the least recently used entries are evicted. The directory size is
+# scanned once and then kept as a running total, so only a put that takes the
+# cache over max_bytes scans the directory again to evict.
+class LocalCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.total_bytes = sum(size for _, size, _ in self.scan())
+
+    def path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json.gz')
+
+    def get(self, key):
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = load_entry(f.read())
+        except (OSError, ValueError):
+            return None
+        if entry is None:
+            self.delete(path)
+            return None
+        # Mark the entry as recently used for eviction
+        os.utime(path)
+        return entry
+
+    def put(self, key, entry):
+        path = self.path(key)
+        data = dump_entry(entry)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        self.total_bytes -= self.size(path)
+        os.replace(temp_path, path)
+        self.total_bytes += len(data)
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def size(self, path):
+        try:
+            return os.stat(path).st_size
+        except OSError:
+            return 0
+
+    def delete(self, path):
+        size = self.size(path)
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        self.total_bytes -= size
+
+    # Function to list the entries as (mtime, size, path)
+    def scan(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.json.gz'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        entries = self.scan()
+        # Resynchronize the running total with the directory
+        total = sum(size for _, size, _ in entries)
+        self.total_bytes = total
+        if total <= self.max_bytes:
+            return
+        # Evict down to 90% of max_bytes so the next puts do not scan again at once
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            self.delete(path)
+            total -= size
+
+# Cache stored as objects in an S3 compatible bucket. Size is left to the
+# bucket's lifecycle rules; expired entries are ignored on read.
+class S3Cache:
+    def __init__(self, bucket=CACHE_S3_BUCKET, prefix=CACHE_S3_PREFIX, endpoint_url=CACHE_S3_ENDPOINT_URL, client=None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = client or lazy_import('boto3').session.Session().client('s3', endpoint_url=endpoint_url)
+
+    def get(self, key):
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.client.exceptions.NoSuchKey:
+            return None
+        return load_entry(response['Body'].read())
+
+    def put(self, key, entry):
+        self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=dump_entry(entry))
+
+# Cache reading from each backend in turn. A hit in a later backend is copied
+# into the earlier ones; writes go to every backend. Backend errors are logged
+# and treated as misses so a broken cache never fails the report.
+class TieredCache:
+    def __init__(self, backends):
+        self.backends = backends
+
+    def get(self, key):
+        for index, backend in enumerate(self.backends):
+            try:
+                entry = backend.get(key)
+            except Exception as e:
+                logger.warning(f"Cache read failed for {key}: {e}")
+                continue
+            if entry is not None:
+                for earlier in self.backends[:index]:
+                    self.put_backend(earlier, key, entry)
+                return entry['value']
+        return None
+
+    def put(self, key, value, ttl):
+        entry = {'expires': time.time() + ttl, 'value': value}
+        for backend in self.backends:
+            self.put_backend(backend, key, entry)
+
+    def put_backend(self, backend, key, entry):
+        try:
+            backend.put(key, entry)
+        except Exception as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+
+# Function to build the cache configured by the environment
+def build_cache():
+    backends = []
+    if CACHE_ENABLED:
+        backends.append(LocalCache())
+        if CACHE_S3_BUCKET:
+            backends.append(S3Cache())
+    return TieredCache(backends)
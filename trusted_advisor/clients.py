@@ -0,0 +1,35 @@
+import os
+import threading
+import time
+from trusted_advisor.startup import lazy_import, record
+
+# Maximum number of check results fetched in parallel, also the size of each client's connection pool
+MAX_CONCURRENCY = int(os.environ.get('MAX_CONCURRENCY', '8'))
+
+# AWS clients are created on first use and reused across warm invocations
+clients = {}
+clients_lock = threading.Lock()
+# ID of the account the Lambda runs in, looked up on first use
+account_id = None
+
+# Function to get the AWS client for a service, creating it on first use
+def get_client(service_name):
+    client = clients.get(service_name)
+    if client is None:
+        with clients_lock:
+            client = clients.get(service_name)
+            if client is None:
+                boto3 = lazy_import('boto3')
+                Config = lazy_import('botocore.config').Config
+                start = time.perf_counter()
+                client = boto3.session.Session().client(service_name, config=Config(max_pool_connections=MAX_CONCURRENCY))
+                record('client', service_name, start)
+                clients[service_name] = client
+    return client
+
+# Function to get the ID of the account the Lambda runs in
+def get_account_id():
+    global account_id
+    if account_id is None:
+        account_id = get_client('sts').get_caller_identity()['Account']
+    return account_id
@@ -0,0 +1,134 @@
+import gzip
+import io
+import logging
+import os
+from collections import Counter
+from html import escape
+from trusted_advisor.clients import get_client
+from trusted_advisor.startup import lazy_import
+
+# Reports up to INLINE_REPORT_MAX_BYTES are sent as the HTML body. Larger ones
+# are sent as a short summary with the report and a CSV of the flagged
+# resources attached gzip compressed. When the compressed report is still over
+# ATTACHMENT_MAX_BYTES it is split at check boundaries over several messages,
+# and the CSV follows in a message of its own.
+# SES rejects messages over 10 MB after base64 encoding, hence the 6 MB default.
+INLINE_REPORT_MAX_BYTES = int(os.environ.get('INLINE_REPORT_MAX_BYTES', str(512 * 1024)))
+ATTACHMENT_MAX_BYTES = int(os.environ.get('ATTACHMENT_MAX_BYTES', str(6 * 1024 * 1024)))
+
+logger = logging.getLogger()
+
+# Function to send email using SES
+def send_email(subject, body, to_addresses):
+    response = get_client('ses').send_email(
+        Source=os.environ['FROM_ADDRESS'],
+        Destination={
+            'ToAddresses': to_addresses
+        },
+        Message={
+            'Subject': {
+                'Data': subject
+            },
+            'Body': {
+                'Html': {
+                    'Data': body
+                }
+            }
+        }
+    )
+    return response
+
+# Function to send an HTML email with attachments ({file name: bytes}) using SES
+def send_raw_email(subject, body, to_addresses, attachments):
+    MIMEApplication = lazy_import('email.mime.application').MIMEApplication
+    MIMEMultipart = lazy_import('email.mime.multipart').MIMEMultipart
+    MIMEText = lazy_import('email.mime.text').MIMEText
+    message = MIMEMultipart('mixed')
+    message['Subject'] = subject
+    message['From'] = os.environ['FROM_ADDRESS']
+    message['To'] = ', '.join(to_addresses)
+    message.attach(MIMEText(body, 'html', 'utf-8'))
+    for file_name, data in attachments.items():
+        attachment = MIMEApplication(data, 'gzip')
+        attachment.add_header('Content-Disposition', 'attachment', filename=file_name)
+        message.attach(attachment)
+    return get_client('ses').send_raw_email(
+        Source=os.environ['FROM_ADDRESS'],
+        Destinations=to_addresses,
+        RawMessage={'Data': message.as_bytes()}
+    )
+
+# Function to write the flagged resources as gzip compressed CSV
+def recommendations_csv(recommendations):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as f:
+        text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+        writer = lazy_import('csv').writer(text)
+        writer.writerow(['Account', 'Category', 'Check', 'Resource ID', 'Status', 'Metadata'])
+        for rec in recommendations:
+            writer.writerow([rec.account_id or '', rec.category, rec.check_name, rec.resource_id, rec.status] + rec.metadata)
+        text.flush()
+        text.detach()
+    return buffer.getvalue()
+
+# Function to render the summary sent in place of a report that is too large to inline
+def summary_html(subject, recommendations, html_size):
+    counts = Counter((rec.category, rec.check_name) for rec in recommendations)
+    out = io.StringIO()
+    out.write(f"<html><body><h2>{escape(subject)}</h2>")
+    out.write(f"<p>The full report ({html_size // 1024} KB) is attached gzip compressed, along with a CSV of all {len(recommendations)} flagged resources.</p>")
+    out.write("<table border=\"1\"><tr><th>Category</th><th>Check</th><th>Flagged Resources</th></tr>")
+    for (category, check_name), count in counts.most_common():
+        out.write(f"<tr><td>{escape(category)}</td><td>{escape(check_name)}</td><td>{count}</td></tr>")
+    out.write("</table></body></html>")
+    return out.getvalue()
+
+# Function to split a report at check headings into parts whose compressed size
+# stays under ATTACHMENT_MAX_BYTES. Sections are compressed one at a time, which
+# slightly overestimates a part's size. A single check larger than the limit is
+# sent alone.
+def split_report(html_table):
+    sections = html_table.split('<h3>')
+    parts = []
+    current = [sections[0]]
+    current_size = len(gzip.compress(sections[0].encode('utf-8')))
+    for section in sections[1:]:
+        section = '<h3>' + section
+        size = len(gzip.compress(section.encode('utf-8')))
+        if current_size + size > ATTACHMENT_MAX_BYTES:
+            parts.append(''.join(current))
+            current = []
+            current_size = 0
+        current.append(section)
+        current_size += size
+    parts.append(''.join(current))
+    return parts
+
+# Function to deliver a report, inline when small enough and as compressed
+# attachments otherwise
+def deliver_report(subject, html_table, to_addresses, recommendations):
+    html_size = len(html_table.encode('utf-8'))
+    if html_size <= INLINE_REPORT_MAX_BYTES:
+        return [send_email(subject=subject, body=html_table, to_addresses=to_addresses)]
+
+    summary = summary_html(subject, recommendations, html_size)
+    report = gzip.compress(html_table.encode('utf-8'))
+    resources = recommendations_csv(recommendations)
+    if len(report) + len(resources) <= ATTACHMENT_MAX_BYTES:
+        return [send_raw_email(subject, summary, to_addresses, {'report.html.gz': report, 'flagged_resources.csv.gz': resources})]
+
+    # Each part fills the attachment budget on its own, so the CSV goes in a
+    # message of its own rather than alongside a part
+    attachments = [
+        (f"report-part{index}.html.gz", gzip.compress(part.encode('utf-8')))
+        for index, part in enumerate(split_report(html_table), 1)
+    ]
+    if len(resources) <= ATTACHMENT_MAX_BYTES:
+        attachments.append(('flagged_resources.csv.gz', resources))
+    else:
+        logger.warning(f"CSV of {len(resources)} bytes is over ATTACHMENT_MAX_BYTES and is not sent")
+    logger.warning(f"Report of {html_size} bytes is sent in {len(attachments)} messages")
+    return [
+        send_raw_email(f"{subject} ({index}/{len(attachments)})", summary, to_addresses, {file_name: data})
+        for index, (file_name, data) in enumerate(attachments, 1)
+    ]
@@ -0,0 +1,54 @@
+import hashlib
+import json
+import os
+
+# Delta reports compare this run's flagged resources with a snapshot of the
+# previous run and only report what is new, changed or resolved. A snapshot
+# maps "check id|resource id" to [category, status, metadata hash].
+DELTA_REPORTS = os.environ.get('DELTA_REPORTS', '').lower() in ('1', 'true', 'yes')
+# Weekday (0 = Monday) on which the full report is sent instead of the delta
+FULL_REPORT_WEEKDAY = os.environ.get('FULL_REPORT_WEEKDAY')
+SNAPSHOT_TTL_SECONDS = int(os.environ.get('SNAPSHOT_TTL_SECONDS', str(90 * 24 * 60 * 60)))
+
+# Function to get the snapshot key of a flagged resource
+def resource_key(recommendation):
+    return f"{recommendation.check_id}|{recommendation.resource_id}"
+
+# Function to hash the metadata of a flagged resource
+def metadata_hash(metadata):
+    return hashlib.sha1(json.dumps(metadata).encode('utf-8')).hexdigest()[:16]
+
+# Function to build the snapshot of this run's flagged resources
+def build_snapshot(recommendations):
+    return {
+        resource_key(rec): [rec.category, rec.status, metadata_hash(rec.metadata)]
+        for rec in recommendations
+    }
+
+# Function to diff this run against the previous snapshot in linear time.
+# Returns the new and changed recommendations, each marked with rec.change,
+# and the resolved resources as (check id, resource id, category, status).
+def diff_snapshot(previous, recommendations):
+    changed = []
+    seen = set()
+    for rec in recommendations:
+        key = resource_key(rec)
+        seen.add(key)
+        before = previous.get(key)
+        if before is None:
+            rec.change = 'new'
+            changed.append(rec)
+        elif before[1] != rec.status or before[2] != metadata_hash(rec.metadata):
+            rec.change = 'changed'
+            changed.append(rec)
+
+    resolved = []
+    for key, (category, status, _) in previous.items():
+        if key not in seen:
+            check_id, resource_id = key.split('|', 1)
+            resolved.append((check_id, resource_id, category, status))
+    return changed, resolved
+
+# Function to decide whether today's report should be the full one
+def is_full_report_day(today):
+    return FULL_REPORT_WEEKDAY is not None and today.weekday() == int(FULL_REPORT_WEEKDAY)
@@ -0,0 +1,319 @@
+import datetime
+import io
+import logging
+import os
+import random
+import threading
+import time
+from trusted_advisor.cache import build_cache
+from trusted_advisor.clients import MAX_CONCURRENCY, get_client
+from trusted_advisor.delivery import deliver_report
+from trusted_advisor.delta import DELTA_REPORTS, SNAPSHOT_TTL_SECONDS, build_snapshot, diff_snapshot, is_full_report_day
+from trusted_advisor.export import export_recommendations
+from trusted_advisor import metrics
+from trusted_advisor.records import CheckInfo, Recommendation, Recommendations
+from trusted_advisor.reporters import render_resolved
+from trusted_advisor.savings import SAVINGS_SUMMARY, render_savings
+from trusted_advisor.startup import lazy_import, report_startup
+
+# Trusted Advisor check categories, in the order they appear in the report
+CATEGORIES = ('cost_optimizing', 'security', 'fault_tolerance', 'performance', 'service_limits')
+
+# Attempts per check before giving up on a throttled call
+MAX_ATTEMPTS = int(os.environ.get('MAX_ATTEMPTS', '6'))
+# Support API requests per second before the first throttle; 0 leaves calls unpaced
+INITIAL_REQUEST_RATE = float(os.environ.get('INITIAL_REQUEST_RATE', '0'))
+# Number of check IDs requested per describe_trusted_advisor_check_summaries call
+SUMMARY_BATCH_SIZE = int(os.environ.get('SUMMARY_BATCH_SIZE', '50'))
+# How long the check catalog and unchanged check results are served from the cache
+CATALOG_TTL_SECONDS = int(os.environ.get('CATALOG_TTL_SECONDS', str(24 * 60 * 60)))
+RESULT_TTL_SECONDS = int(os.environ.get('RESULT_TTL_SECONDS', str(7 * 24 * 60 * 60)))
+# Refresh the checks before reading their results
+REFRESH_CHECKS = os.environ.get('REFRESH_CHECKS', '').lower() in ('1', 'true', 'yes')
+
+cache = None
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Function to get the catalog and check result cache, creating it on first use
+def get_cache():
+    global cache
+    if cache is None:
+        cache = build_cache()
+    return cache
+
+THROTTLING_ERROR_CODES = ('Throttling', 'ThrottlingException', 'TooManyRequestsException', 'RequestLimitExceeded')
+
+# Rate limiter shared by the fetch workers. Calls are unpaced (or paced at
+# INITIAL_REQUEST_RATE) until the Support API throttles; each throttle halves
+# the allowed rate, starting from at most max_rate, and the rate grows slowly
+# again while calls succeed.
+class AdaptiveRateLimiter:
+    def __init__(self, rate=INITIAL_REQUEST_RATE, min_rate=0.5, max_rate=50.0):
+        self.rate = rate or float('inf')
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + 1.0 / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + 0.5)
+
+    def on_throttle(self):
+        with self.lock:
+            self.rate = max(self.min_rate, min(self.rate, self.max_rate) / 2)
+
+# Function to call the Support API, backing off with full jitter when throttled.
+# A timing dict is filled with the start and end of the successful attempt, which
+# leave out the rate limiter and backoff waits, and the number of throttled retries.
+def call_with_backoff(limiter, operation, timing=None, **kwargs):
+    ClientError = lazy_import('botocore.exceptions').ClientError
+    for attempt in range(MAX_ATTEMPTS):
+        limiter.acquire()
+        start = time.time()
+        try:
+            response = operation(**kwargs)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in THROTTLING_ERROR_CODES or attempt == MAX_ATTEMPTS - 1:
+                raise
+            limiter.on_throttle()
+            time.sleep(random.uniform(0, min(20.0, 0.5 * 2 ** attempt)))
+        else:
+            limiter.on_success()
+            if timing is not None:
+                timing.update(start=start, end=time.time(), retries=attempt)
+            return response
+
+# Function to fetch check results concurrently, returned in the same order as check_ids
+def fetch_check_results(check_ids, limiter=None, max_concurrency=MAX_CONCURRENCY, client=None):
+    ThreadPoolExecutor = lazy_import('concurrent.futures').ThreadPoolExecutor
+    limiter = limiter or AdaptiveRateLimiter()
+    trusted_advisor_client = client or get_client('support')
+
+    def fetch(check_id):
+        if not metrics.enabled():
+            return call_with_backoff(limiter, trusted_advisor_client.describe_trusted_advisor_check_result, checkId=check_id)
+        timing = {}
+        response = call_with_backoff(limiter, trusted_advisor_client.describe_trusted_advisor_check_result, timing=timing, checkId=check_id)
+        metrics.record_check(check_id, timing['start'], timing['end'], response, timing['retries'])
+        return response
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        return list(executor.map(fetch, check_ids))
+
+# Function to get check summaries in batches, keyed by check ID
+def fetch_check_summaries(check_ids, limiter=None, client=None):
+    limiter = limiter or AdaptiveRateLimiter()
+    trusted_advisor_client = client or get_client('support')
+    summaries = {}
+    for start in range(0, len(check_ids), SUMMARY_BATCH_SIZE):
+        response = call_with_backoff(
+            limiter,
+            trusted_advisor_client.describe_trusted_advisor_check_summaries,
+            checkIds=check_ids[start:start + SUMMARY_BATCH_SIZE]
+        )
+        for summary in response['summaries']:
+            summaries[summary['checkId']] = summary
+    return summaries
+
+# Function to decide from its summary whether a check needs its full result.
+# Checks without a summary are fetched so nothing is dropped silently.
+def needs_full_result(summary):
+    if summary is None:
+        return True
+    if summary.get('hasFlaggedResources') or summary.get('resourcesSummary', {}).get('resourcesFlagged', 0) > 0:
+        return True
+    return summary.get('status') not in ('ok', 'not_available')
+
+# Function to get check results in the order of checks. A cached result is reused
+# when its refresh timestamp matches the one in the check summary. Results of
+# member accounts are cached under their account ID.
+def get_check_results(checks, summaries, limiter=None, client=None, account_id=None):
+    cache = get_cache()
+    key_prefix = f"result/{account_id}/" if account_id else "result/"
+    results = {}
+    for check in checks:
+        summary = summaries.get(check['id'])
+        if summary and summary.get('timestamp'):
+            cached = cache.get(key_prefix + check['id'])
+            if cached is not None and cached['result'].get('timestamp') == summary['timestamp']:
+                results[check['id']] = cached
+
+    missing = [check['id'] for check in checks if check['id'] not in results]
+    for check_id, check_result in zip(missing, fetch_check_results(missing, limiter, client=client)):
+        results[check_id] = {'result': check_result['result']}
+        if check_result['result'].get('timestamp'):
+            cache.put(key_prefix + check_id, results[check_id], RESULT_TTL_SECONDS)
+    return [results[check['id']] for check in checks]
+
+# Function to get the checks of the requested categories from a single (cached) catalog call
+def get_trusted_advisor_checks(categories):
+    cache = get_cache()
+    with metrics.timed('catalog'):
+        checks = cache.get('catalog/en')
+        if checks is None:
+            checks = get_client('support').describe_trusted_advisor_checks(language='en')['checks']
+            cache.put('catalog/en', checks, CATALOG_TTL_SECONDS)
+    return [check for check in checks if check['category'] in categories]
+
+# Function to get the recommendations of the given checks, in check order
+def fetch_recommendations(checks, limiter, client=None, account_id=None):
+    # Only download full results for checks whose summary reports something to look at
+    with metrics.timed('summaries', account_id=account_id):
+        summaries = fetch_check_summaries([check['id'] for check in checks], limiter, client)
+    flagged_checks = []
+    for check in checks:
+        if needs_full_result(summaries.get(check['id'])):
+            flagged_checks.append(check)
+        else:
+            logger.warning(f"No flagged resources for check: {check['name']}")
+
+    with metrics.timed('results', account_id=account_id):
+        check_results = get_check_results(flagged_checks, summaries, limiter, client, account_id)
+    return build_recommendations(flagged_checks, check_results, account_id)
+
+# Function to build the recommendations of checks from their results, in check order
+def build_recommendations(checks, check_results, account_id=None):
+    recommendations = Recommendations()
+    for check, check_result in zip(checks, check_results):
+        # Check if 'flaggedResources' key exists in the result
+        if check_result['result'].get('flaggedResources'):
+            info = CheckInfo(check)
+            recommendations.add_check(info, [
+                Recommendation(info, account_id, resource) for resource in check_result['result']['flaggedResources']
+            ])
+        else:
+            logger.warning(f"No flagged resources for check: {check['name']}")
+
+    return recommendations
+
+# Function to get Trusted Advisor recommendations for the given checks. client and
+# account_id select a member account; by default the Lambda's own account is used.
+# With refresh the checks are refreshed first, and each batch of checks is fetched
+# as soon as its refresh completes. When the refresh fails the checks are read
+# without it, from their last results.
+def get_trusted_advisor_recommendations(checks, client=None, account_id=None, refresh=REFRESH_CHECKS):
+    limiter = AdaptiveRateLimiter()
+    if refresh:
+        try:
+            return fetch_refreshed_recommendations(checks, limiter, client, account_id)
+        except Exception as e:
+            logger.error(f"Refreshing the checks failed, reading their last results instead: {e}")
+    return fetch_recommendations(checks, limiter, client, account_id)
+
+# Function to refresh the checks and fetch each batch of checks as soon as its
+# refresh completes, returning the recommendations in check order
+def fetch_refreshed_recommendations(checks, limiter, client=None, account_id=None):
+    refresh_checks = lazy_import('trusted_advisor.refresh').refresh_checks
+    ThreadPoolExecutor = lazy_import('concurrent.futures').ThreadPoolExecutor
+    checks_by_id = {check['id']: check for check in checks}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(fetch_recommendations, [checks_by_id[check_id] for check_id in batch], limiter, client, account_id)
+            for batch in refresh_checks(list(checks_by_id), limiter, client)
+        ]
+        by_check = {}
+        for future in futures:
+            for rec in future.result():
+                by_check.setdefault(rec.check_id, []).append(rec)
+    # Merge the batches back into catalog order
+    recommendations = Recommendations()
+    for check in checks:
+        if check['id'] in by_check:
+            recs = by_check[check['id']]
+            recommendations.add_check(recs[0].check, recs)
+    return recommendations
+
+# Function to group recommendations by category and then by check name, keeping fetch
+# order. Recommendations collected by fetch_recommendations are already grouped.
+def group_recommendations(recommendations):
+    if isinstance(recommendations, Recommendations):
+        return recommendations.grouped
+    grouped_recommendations = {}
+    for recommendation in recommendations:
+        by_check = grouped_recommendations.setdefault(recommendation.category, {})
+        by_check.setdefault(recommendation.check_name, []).append(recommendation)
+    return grouped_recommendations
+
+# Function to render the recommendations of one account into out, one section per
+# reporter. With DELTA_REPORTS only the resources that changed since the snapshot
+# stored under snapshot_key are rendered, except on the FULL_REPORT_WEEKDAY or when
+# full_report is set. Returns the new snapshot to save once the report has been
+# delivered, or None without DELTA_REPORTS.
+def render_recommendations(reporters, checks, recommendations, out, snapshot_key, full_report=None):
+    resolved = None
+    snapshot = None
+    if DELTA_REPORTS:
+        snapshot = build_snapshot(recommendations)
+        previous = get_cache().get(snapshot_key)
+        if full_report is None:
+            full_report = is_full_report_day(datetime.date.today())
+        if previous is not None and not full_report:
+            recommendations, resolved = diff_snapshot(previous, recommendations)
+    grouped_recommendations = group_recommendations(recommendations)
+
+    if resolved is not None:
+        new = sum(1 for rec in recommendations if rec.change == 'new')
+        out.write(f"<p>Changes since the last run: {new} new, {len(recommendations) - new} changed, {len(resolved)} resolved.</p>")
+    for reporter in reporters:
+        reporter.render(grouped_recommendations.get(reporter.category, {}), out)
+    if resolved:
+        render_resolved(resolved, {check['id']: check['name'] for check in checks}, out)
+    return snapshot
+
+# Function to get the email subject for a set of reporters
+def report_subject(reporters):
+    if len(reporters) == 1:
+        return reporters[0].title
+    return "AWS Trusted Advisor Recommendations"
+
+# Function to run every reporter over one catalog fetch and one round of check results,
+# sending a single email that holds a section per category
+def run_report(reporters, to_addresses=None, full_report=None):
+    checks = get_trusted_advisor_checks([reporter.category for reporter in reporters])
+    recommendations = get_trusted_advisor_recommendations(checks)
+    return send_report(reporters, checks, recommendations, to_addresses, full_report)
+
+# Function to render the HTML report of one account: the savings summary followed
+# by a section per reporter. Returns the report and the snapshot to save, as
+# render_recommendations does.
+def render_report(reporters, checks, recommendations, snapshot_key, full_report=None):
+    out = io.StringIO()
+    out.write("<html><body>")
+    if SAVINGS_SUMMARY:
+        render_savings(recommendations, out)
+    snapshot = render_recommendations(reporters, checks, recommendations, out, snapshot_key, full_report)
+    out.write("</body></html>")
+    return out.getvalue(), snapshot
+
+# Function to render the recommendations of the Lambda's own account into one
+# email, deliver it and export the flagged resources
+def send_report(reporters, checks, recommendations, to_addresses=None, full_report=None):
+    snapshot_key = 'snapshot/' + '-'.join(reporter.category for reporter in reporters)
+    with metrics.timed('render'):
+        html_table, snapshot = render_report(reporters, checks, recommendations, snapshot_key, full_report)
+
+    with metrics.timed('send', report_bytes=len(html_table)):
+        deliver_report(
+            subject=report_subject(reporters),
+            html_table=html_table,
+            to_addresses=to_addresses or os.environ['TO_ADDRESS'].split(','),
+            recommendations=recommendations
+        )
+    with metrics.timed('export'):
+        export_recommendations(recommendations)
+    if snapshot is not None:
+        get_cache().put(snapshot_key, snapshot, SNAPSHOT_TTL_SECONDS)
+    metrics.emit_metrics({check['id']: check['name'] for check in checks}, len(recommendations))
+    report_startup()
+    return html_table
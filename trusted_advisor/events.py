@@ -0,0 +1,133 @@
+import datetime
+import json
+import logging
+import os
+from trusted_advisor.engine import (
+    AdaptiveRateLimiter, build_recommendations, fetch_check_summaries, get_cache, get_check_results,
+    get_trusted_advisor_checks, needs_full_result, send_report
+)
+from trusted_advisor import metrics
+from trusted_advisor.startup import report_startup
+
+# Event driven mode keeps the latest result of every check as persisted state,
+# updated by Trusted Advisor "Check Item Refresh Notification" EventBridge
+# events (delivered one at a time, as a list, or batched through SQS). Only the
+# checks named in the events are fetched again. The scheduled rule (or an event
+# holding {"digest": true}) sends the digest built from that state without
+# scanning the checks again; checks without state yet are fetched once to seed
+# it. Any other event is logged and ignored.
+# Keep the state in S3 (CACHE_S3_BUCKET) so it survives cold starts.
+EVENT_DRIVEN = os.environ.get('EVENT_DRIVEN', '').lower() in ('1', 'true', 'yes')
+STATE_TTL_SECONDS = int(os.environ.get('STATE_TTL_SECONDS', str(90 * 24 * 60 * 60)))
+
+REFRESH_EVENT_SOURCE = 'aws.trustedadvisor'
+REFRESH_EVENT_DETAIL_TYPE = 'Trusted Advisor Check Item Refresh Notification'
+SCHEDULED_EVENT_SOURCE = 'aws.events'
+SCHEDULED_EVENT_DETAIL_TYPE = 'Scheduled Event'
+
+logger = logging.getLogger()
+
+# Function to decode the bodies of an SQS batch, skipping records that are not JSON
+def sqs_bodies(records):
+    bodies = []
+    for record in records:
+        try:
+            bodies.append(json.loads(record['body']))
+        except (KeyError, TypeError, ValueError):
+            logger.warning(f"Ignoring SQS message {record.get('messageId')} without a JSON body")
+    return bodies
+
+# Function to get the Trusted Advisor refresh events of an invocation. Accepts a
+# single EventBridge event, a list of them, or an SQS batch of them.
+def parse_refresh_events(event):
+    if isinstance(event, list):
+        candidates = event
+    elif isinstance(event, dict) and 'Records' in event:
+        candidates = sqs_bodies(event['Records'])
+    else:
+        candidates = [event]
+    return [
+        candidate for candidate in candidates
+        if isinstance(candidate, dict)
+        and candidate.get('source') == REFRESH_EVENT_SOURCE
+        and candidate.get('detail-type') == REFRESH_EVENT_DETAIL_TYPE
+    ]
+
+# Function to get the state key of a check
+def state_key(check_id):
+    return f"state/{check_id}"
+
+# Function to fetch the current result of checks and store it as their state.
+# Checks whose summary shows nothing flagged are stored without resources, so
+# resolved resources drop out of the next digest. Returns {check id: state}.
+def update_check_states(checks):
+    cache = get_cache()
+    limiter = AdaptiveRateLimiter()
+    with metrics.timed('summaries'):
+        summaries = fetch_check_summaries([check['id'] for check in checks], limiter)
+    flagged_checks = [check for check in checks if needs_full_result(summaries.get(check['id']))]
+    with metrics.timed('results'):
+        check_results = dict(zip(
+            (check['id'] for check in flagged_checks),
+            get_check_results(flagged_checks, summaries, limiter)
+        ))
+
+    updated = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds')
+    states = {}
+    for check in checks:
+        if check['id'] in check_results:
+            result = check_results[check['id']]['result']
+        else:
+            result = {'timestamp': summaries[check['id']].get('timestamp'), 'flaggedResources': []}
+        states[check['id']] = {'result': result, 'updated': updated}
+        cache.put(state_key(check['id']), states[check['id']], STATE_TTL_SECONDS)
+    return states
+
+# Function to update the state of the checks named in refresh events. Events for
+# checks outside the reporters' categories are ignored. Returns the checks updated.
+def handle_refresh_events(reporters, events):
+    checks_by_name = {check['name']: check for check in get_trusted_advisor_checks([reporter.category for reporter in reporters])}
+    checks = {}
+    for event in events:
+        check = checks_by_name.get(event.get('detail', {}).get('check-name'))
+        if check is not None:
+            checks[check['id']] = check
+    logger.info(f"{len(events)} refresh events for {len(checks)} checks")
+    if not checks:
+        return []
+    update_check_states(list(checks.values()))
+    return list(checks.values())
+
+# Function to send the digest of the reporters' categories from the check state
+def send_digest(reporters, to_addresses=None, full_report=None):
+    checks = get_trusted_advisor_checks([reporter.category for reporter in reporters])
+    cache = get_cache()
+    states = {check['id']: cache.get(state_key(check['id'])) for check in checks}
+    missing = [check for check in checks if states[check['id']] is None]
+    if missing:
+        logger.warning(f"No state for {len(missing)} checks; fetching them")
+        states.update(update_check_states(missing))
+    recommendations = build_recommendations(checks, [states[check['id']] for check in checks])
+    return send_report(reporters, checks, recommendations, to_addresses, full_report)
+
+# Function to tell whether an invocation asks for the digest
+def is_digest_trigger(event):
+    if not isinstance(event, dict):
+        return False
+    if event.get('digest') is True:
+        return True
+    return event.get('source') == SCHEDULED_EVENT_SOURCE and event.get('detail-type') == SCHEDULED_EVENT_DETAIL_TYPE
+
+# Function to handle an invocation in event driven mode: refresh events update
+# the check state, the scheduled trigger sends the digest and anything else is ignored
+def handle_event(reporters, event):
+    events = parse_refresh_events(event)
+    if events:
+        updated = handle_refresh_events(reporters, events)
+        metrics.emit_metrics({check['id']: check['name'] for check in updated})
+        report_startup()
+        return [check['id'] for check in updated]
+    if is_digest_trigger(event):
+        return send_digest(reporters)
+    logger.warning("Ignoring an event that is neither a Trusted Advisor refresh event nor the digest trigger")
+    return None
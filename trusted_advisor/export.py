@@ -0,0 +1,137 @@
+import datetime
+import logging
+import math
+import os
+import re
+from trusted_advisor.clients import get_account_id
+from trusted_advisor.startup import lazy_import
+
+# Each run's flagged resources can be exported as a Hive partitioned dataset
+# (date=/category=/check=) for Athena or DuckDB. EXPORT_PATH is a local
+# directory or an s3://bucket/prefix URI; EXPORT_FORMAT is parquet or arrow
+# (Arrow IPC). Export needs pyarrow, e.g. from a Lambda layer.
+EXPORT_PATH = os.environ.get('EXPORT_PATH')
+EXPORT_FORMAT = os.environ.get('EXPORT_FORMAT', 'parquet')
+EXPORT_S3_ENDPOINT_URL = os.environ.get('EXPORT_S3_ENDPOINT_URL')
+
+# Check catalog column names holding money amounts
+SAVINGS_COLUMNS = ('estimated monthly savings',)
+COST_COLUMNS = ('current monthly cost', 'monthly storage cost')
+MONEY_PATTERN = re.compile(r'[-+]?(\d+\.?\d*|\.\d+)$')
+
+logger = logging.getLogger()
+
+# Function to parse a money amount such as "$1,234.50", returning None when it is
+# not one. Only plain decimals are accepted, so "nan", "inf" or "1e3" never reach
+# the totals.
+def parse_money(value):
+    if value is None:
+        return None
+    amount = str(value).replace('$', '').replace(',', '').strip()
+    if not MONEY_PATTERN.match(amount):
+        return None
+    amount = float(amount)
+    return amount if math.isfinite(amount) else None
+
+# Function to parse many money amounts, with None where a value is not one
+def parse_money_values(values):
+    return [parse_money(value) for value in values]
+
+# Function to find the metadata position of the first of names in the check columns
+def column_index(columns, names):
+    for index, column in enumerate(columns):
+        if column.lower() in names:
+            return index
+    return None
+
+# Function to get the value at index of every resource's metadata
+def metadata_values(recs, index):
+    if index is None:
+        return [None] * len(recs)
+    return [rec.metadata[index] if index < len(rec.metadata) else None for rec in recs]
+
+# Function to get the value at index of every resource's metadata as money amounts
+def money_values(recs, index):
+    if index is None:
+        return [None] * len(recs)
+    return parse_money_values(metadata_values(recs, index))
+
+# Function to build the Arrow schema of an exported partition
+def export_schema(pa):
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('run_time', pa.timestamp('s', tz='UTC')),
+        ('account_id', pa.string()),
+        ('check_name', pa.string()),
+        ('resource_id', pa.string()),
+        ('region', dictionary),
+        ('status', dictionary),
+        ('estimated_monthly_savings', pa.float64()),
+        ('current_monthly_cost', pa.float64()),
+        ('metadata', pa.list_(pa.string())),
+    ])
+
+# Function to build the table of one check's flagged resources. Resources of the
+# Lambda's own account carry no account ID and are exported with own_account_id.
+def build_table(pa, recs, run_time, own_account_id=None):
+    columns = recs[0].columns
+    return pa.table({
+        'run_time': [run_time] * len(recs),
+        'account_id': [rec.account_id or own_account_id for rec in recs],
+        'check_name': [rec.check_name for rec in recs],
+        'resource_id': [rec.resource_id for rec in recs],
+        'region': [rec.region for rec in recs],
+        'status': [rec.status for rec in recs],
+        'estimated_monthly_savings': money_values(recs, column_index(columns, SAVINGS_COLUMNS)),
+        'current_monthly_cost': money_values(recs, column_index(columns, COST_COLUMNS)),
+        'metadata': [rec.metadata for rec in recs],
+    }, schema=export_schema(pa))
+
+# Function to get the filesystem and base path for EXPORT_PATH
+def export_filesystem(fs, export_path):
+    if export_path.startswith('s3://') and EXPORT_S3_ENDPOINT_URL:
+        return fs.S3FileSystem(endpoint_override=EXPORT_S3_ENDPOINT_URL), export_path[len('s3://'):]
+    return fs.FileSystem.from_uri(export_path if '://' in export_path else os.path.abspath(export_path))
+
+# Function to export the flagged resources of a run, one file per check partition.
+# Returns the paths written. Export problems are logged and never fail the report.
+def export_recommendations(recommendations, export_path=EXPORT_PATH, run_time=None):
+    if not export_path or not recommendations:
+        return []
+    try:
+        pa = lazy_import('pyarrow')
+        fs = lazy_import('pyarrow.fs')
+    except ImportError:
+        logger.warning("EXPORT_PATH is set but pyarrow is not installed; skipping export")
+        return []
+
+    run_time = run_time or datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    by_check = {}
+    for rec in recommendations:
+        by_check.setdefault((rec.category, rec.check_id), []).append(rec)
+
+    own_account_id = None
+    if any(rec.account_id is None for rec in recommendations):
+        try:
+            own_account_id = get_account_id()
+        except Exception as e:
+            logger.warning(f"Could not look up the account ID for the export: {e}")
+
+    paths = []
+    try:
+        filesystem, base_path = export_filesystem(fs, export_path)
+        extension = 'arrow' if EXPORT_FORMAT == 'arrow' else 'parquet'
+        for (category, check_id), recs in by_check.items():
+            directory = f"{base_path.rstrip('/')}/date={run_time:%Y-%m-%d}/category={category}/check={check_id}"
+            path = f"{directory}/{run_time:%H%M%S}.{extension}"
+            filesystem.create_dir(directory, recursive=True)
+            table = build_table(pa, recs, run_time, own_account_id)
+            if extension == 'arrow':
+                with filesystem.open_output_stream(path) as f, pa.ipc.new_file(f, table.schema) as writer:
+                    writer.write_table(table)
+            else:
+                lazy_import('pyarrow.parquet').write_table(table, path, filesystem=filesystem, compression='zstd')
+            paths.append(path)
+    except Exception as e:
+        logger.error(f"Export to {export_path} failed: {e}")
+    return paths
@@ -0,0 +1,89 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Set METRICS_ENABLED=1 to log phase and per-check timings as CloudWatch
+# Embedded Metric Format lines, which CloudWatch Logs turns into metrics in
+# METRICS_NAMESPACE. A trace hook, called as hook(name, start, end, attributes)
+# with epoch seconds, can forward the same spans to a tracer. With both off
+# the instrumentation is a flag check.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'TrustedAdvisorReport')
+
+# (phase, milliseconds) and (check id, milliseconds, payload bytes, flagged resources, retries) of the current run
+phase_timings = []
+check_timings = []
+trace_hook = None
+
+# Function to install the trace hook, or remove it with None
+def set_trace_hook(hook):
+    global trace_hook
+    trace_hook = hook
+
+# Function to tell whether anything consumes the measurements
+def enabled():
+    return METRICS_ENABLED or trace_hook is not None
+
+# Context manager timing one phase of the run
+@contextmanager
+def timed(phase, **attributes):
+    if not enabled():
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        end = time.time()
+        if METRICS_ENABLED:
+            phase_timings.append((phase, (end - start) * 1000))
+        if trace_hook is not None:
+            trace_hook(phase, start, end, attributes)
+
+# Function to record one describe_trusted_advisor_check_result call. start and end
+# bound the successful attempt only; retries counts the throttled attempts before it.
+def record_check(check_id, start, end, response, retries=0):
+    result = response.get('result', {})
+    flagged = len(result.get('flaggedResources') or [])
+    headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+    if 'content-length' in headers:
+        payload_bytes = int(headers['content-length'])
+    else:
+        payload_bytes = len(json.dumps(result))
+    if METRICS_ENABLED:
+        check_timings.append((check_id, (end - start) * 1000, payload_bytes, flagged, retries))
+    if trace_hook is not None:
+        trace_hook('check_result', start, end, {'check_id': check_id, 'payload_bytes': payload_bytes, 'flagged_resources': flagged, 'retries': retries})
+
+# Function to build one EMF log line
+def emf_line(dimensions, metrics, values):
+    return json.dumps(dict({
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': METRICS_NAMESPACE,
+                'Dimensions': [list(dimensions)],
+                'Metrics': [{'Name': name, 'Unit': unit} for name, unit in metrics],
+            }],
+        },
+    }, **dimensions, **values))
+
+# Function to print the measurements of the run as EMF lines and reset them.
+# check_names maps check IDs to the names used as the CheckName dimension.
+def emit_metrics(check_names=None, resources=None):
+    if not METRICS_ENABLED:
+        return
+    check_names = check_names or {}
+    for phase, ms in phase_timings:
+        print(emf_line({'Phase': phase}, [('Duration', 'Milliseconds')], {'Duration': ms}))
+    for check_id, ms, payload_bytes, flagged, retries in check_timings:
+        print(emf_line(
+            {'CheckName': check_names.get(check_id, check_id)},
+            [('CheckLatency', 'Milliseconds'), ('PayloadBytes', 'Bytes'), ('FlaggedResources', 'Count'), ('ThrottledRetries', 'Count')],
+            {'CheckId': check_id, 'CheckLatency': ms, 'PayloadBytes': payload_bytes, 'FlaggedResources': flagged, 'ThrottledRetries': retries}
+        ))
+    if resources is not None:
+        print(emf_line({'Report': 'total'}, [('FlaggedResources', 'Count')], {'FlaggedResources': resources}))
+    phase_timings.clear()
+    check_timings.clear()
@@ -0,0 +1,133 @@
+import io
+import logging
+import os
+import time
+from html import escape
+from trusted_advisor.delivery import deliver_report
+from trusted_advisor.delta import SNAPSHOT_TTL_SECONDS
+from trusted_advisor.engine import (
+    get_cache, get_client, get_trusted_advisor_checks, get_trusted_advisor_recommendations,
+    render_recommendations, report_subject
+)
+from trusted_advisor.export import export_recommendations
+from trusted_advisor import metrics
+from trusted_advisor.reporters import write_table
+from trusted_advisor.savings import SAVINGS_SUMMARY, render_savings
+from trusted_advisor.startup import lazy_import, report_startup
+
+# Organization mode runs the report for every active member account from the
+# management (or delegated administrator) account. Each member account needs a
+# role that trusts this Lambda and allows the support:Describe* calls.
+ORGANIZATION_ROLE_NAME = os.environ.get('ORGANIZATION_ROLE_NAME', 'TrustedAdvisorReadOnly')
+# Number of accounts processed in parallel
+ACCOUNT_CONCURRENCY = int(os.environ.get('ACCOUNT_CONCURRENCY', '4'))
+# Time allowed for one account, from the moment its worker starts
+ACCOUNT_TIMEOUT_SECONDS = float(os.environ.get('ACCOUNT_TIMEOUT_SECONDS', '120'))
+
+logger = logging.getLogger()
+
+# Function to list the active accounts of the organization as (account id, name)
+def list_member_accounts(organizations_client=None):
+    organizations_client = organizations_client or get_client('organizations')
+    accounts = []
+    for page in organizations_client.get_paginator('list_accounts').paginate():
+        for account in page['Accounts']:
+            if account['Status'] == 'ACTIVE':
+                accounts.append((account['Id'], account.get('Name', '')))
+    return accounts
+
+# Function to build a Support client in a member account by assuming ORGANIZATION_ROLE_NAME
+def assume_support_client(account_id, sts_client=None):
+    sts_client = sts_client or get_client('sts')
+    credentials = sts_client.assume_role(
+        RoleArn=f"arn:aws:iam::{account_id}:role/{ORGANIZATION_ROLE_NAME}",
+        RoleSessionName='trusted-advisor-report'
+    )['Credentials']
+    # The Support API is only served from us-east-1
+    return lazy_import('boto3').session.Session(
+        aws_access_key_id=credentials['AccessKeyId'],
+        aws_secret_access_key=credentials['SecretAccessKey'],
+        aws_session_token=credentials['SessionToken']
+    ).client('support', region_name='us-east-1')
+
+# Function to fetch the recommendations of every account with a bounded worker pool.
+# A failing or timed out account is recorded in failures and does not affect the
+# others. Returns ({account id: recommendations}, {account id: error message}).
+def fetch_organization_recommendations(accounts, checks, client_factory=assume_support_client,
+                                       max_workers=ACCOUNT_CONCURRENCY, timeout=ACCOUNT_TIMEOUT_SECONDS):
+    futures_module = lazy_import('concurrent.futures')
+    started = {}
+
+    def fetch(account_id):
+        started[account_id] = time.monotonic()
+        return get_trusted_advisor_recommendations(checks, client=client_factory(account_id), account_id=account_id)
+
+    results = {}
+    failures = {}
+    executor = futures_module.ThreadPoolExecutor(max_workers=max(1, max_workers))
+    pending = {executor.submit(fetch, account_id): account_id for account_id, _ in accounts}
+    try:
+        while pending:
+            done, _ = futures_module.wait(pending, timeout=1, return_when=futures_module.FIRST_COMPLETED)
+            for future in done:
+                account_id = pending.pop(future)
+                try:
+                    results[account_id] = future.result()
+                except Exception as e:
+                    logger.error(f"Trusted Advisor report failed for account {account_id}: {e}")
+                    failures[account_id] = str(e)
+            now = time.monotonic()
+            for future, account_id in list(pending.items()):
+                if account_id in started and now - started[account_id] > timeout:
+                    # The worker thread cannot be interrupted; its result is ignored
+                    logger.error(f"Trusted Advisor report timed out for account {account_id}")
+                    failures[account_id] = f"Timed out after {timeout:.0f} seconds"
+                    del pending[future]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return results, failures
+
+# Function to run the reporters for every account of the organization and send a
+# single email with a section per account
+def run_organization_report(reporters, to_addresses=None, full_report=None, organizations_client=None,
+                            client_factory=assume_support_client, timeout=ACCOUNT_TIMEOUT_SECONDS):
+    categories = [reporter.category for reporter in reporters]
+    accounts = list_member_accounts(organizations_client)
+    checks = get_trusted_advisor_checks(categories)
+    results, failures = fetch_organization_recommendations(accounts, checks, client_factory, timeout=timeout)
+
+    recommendations = [rec for account_id, _ in accounts for rec in results.get(account_id, [])]
+    out = io.StringIO()
+    out.write("<html><body>")
+    snapshots = {}
+    with metrics.timed('render'):
+        if SAVINGS_SUMMARY:
+            render_savings(recommendations, out)
+        for account_id, account_name in accounts:
+            if account_id not in results:
+                continue
+            out.write(f"<h1>Account {escape(account_id)} ({escape(account_name)})</h1>")
+            snapshot_key = f"snapshot/{account_id}/" + '-'.join(categories)
+            snapshot = render_recommendations(reporters, checks, results[account_id], out, snapshot_key, full_report)
+            if snapshot is not None:
+                snapshots[snapshot_key] = snapshot
+        if failures:
+            out.write("<h1>Accounts that could not be checked</h1>")
+            write_table(out, ['Account', 'Error'], sorted(failures.items()))
+        out.write("</body></html>")
+        html_table = out.getvalue()
+
+    with metrics.timed('send', report_bytes=len(html_table)):
+        deliver_report(
+            subject=report_subject(reporters),
+            html_table=html_table,
+            to_addresses=to_addresses or os.environ['TO_ADDRESS'].split(','),
+            recommendations=recommendations
+        )
+    with metrics.timed('export'):
+        export_recommendations(recommendations)
+    for snapshot_key, snapshot in snapshots.items():
+        get_cache().put(snapshot_key, snapshot, SNAPSHOT_TTL_SECONDS)
+    metrics.emit_metrics({check['id']: check['name'] for check in checks}, len(recommendations))
+    report_startup()
+    return html_table
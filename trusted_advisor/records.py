@@ -0,0 +1,67 @@
+from trusted_advisor.reporters import extract_description
+
+# Flagged resources are kept as compact records. The fields every resource of
+# a check has in common (name, category, catalog columns and the long HTML
+# description) live once in a CheckInfo that the records reference, so memory
+# grows with the number of resources and not with the description length.
+
+# Catalog data shared by the flagged resources of one check
+class CheckInfo:
+    __slots__ = ('id', 'name', 'category', 'columns', 'description', 'short_description')
+
+    def __init__(self, check):
+        self.id = check['id']
+        self.name = check['name']
+        self.category = check['category']
+        self.columns = check.get('metadata') or []
+        self.description = check.get('description', '')
+        self.short_description = None
+
+    # Function to get the description up to its alert criteria, extracted once per check
+    def summary(self):
+        if self.short_description is None:
+            self.short_description = extract_description(self.description) or ''
+        return self.short_description
+
+# One flagged resource. change is set by delta reports to 'new' or 'changed'.
+class Recommendation:
+    __slots__ = ('check', 'account_id', 'resource_id', 'status', 'region', 'metadata', 'change')
+
+    def __init__(self, check, account_id, resource):
+        self.check = check
+        self.account_id = account_id
+        self.resource_id = resource['resourceId']
+        self.status = resource['status']
+        self.region = resource.get('region')
+        self.metadata = resource.get('metadata', [])
+        self.change = None
+
+    @property
+    def category(self):
+        return self.check.category
+
+    @property
+    def check_id(self):
+        return self.check.id
+
+    @property
+    def check_name(self):
+        return self.check.name
+
+    @property
+    def columns(self):
+        return self.check.columns
+
+# List of recommendations in fetch order that also keeps them grouped by
+# category and then by check name as each check's resources are added, so
+# rendering needs no second grouping pass
+class Recommendations(list):
+    def __init__(self):
+        super().__init__()
+        self.grouped = {}
+
+    # Function to add the flagged resources of one check
+    def add_check(self, check, recs):
+        self.extend(recs)
+        by_check = self.grouped.setdefault(check.category, {})
+        by_check.setdefault(check.name, []).extend(recs)
@@ -0,0 +1,107 @@
+import logging
+import os
+import random
+import time
+from trusted_advisor.engine import MAX_CONCURRENCY, SUMMARY_BATCH_SIZE, THROTTLING_ERROR_CODES, call_with_backoff, get_client
+from trusted_advisor.startup import lazy_import
+
+# Longest time to wait for refreshes before falling back to the cached results
+REFRESH_TIMEOUT_SECONDS = float(os.environ.get('REFRESH_TIMEOUT_SECONDS', '300'))
+# First and longest delay between two polls of the refresh statuses
+REFRESH_POLL_SECONDS = float(os.environ.get('REFRESH_POLL_SECONDS', '2'))
+REFRESH_MAX_POLL_SECONDS = float(os.environ.get('REFRESH_MAX_POLL_SECONDS', '30'))
+
+IN_PROGRESS_STATUSES = ('enqueued', 'processing')
+
+logger = logging.getLogger()
+
+# Function to get the refresh statuses of checks in batches, keyed by check ID.
+# Checks whose status cannot be read are left out, and callers treat them as ready.
+def fetch_refresh_statuses(check_ids, limiter, client):
+    statuses = {}
+    for start in range(0, len(check_ids), SUMMARY_BATCH_SIZE):
+        statuses.update(fetch_refresh_status_batch(check_ids[start:start + SUMMARY_BATCH_SIZE], limiter, client))
+    return statuses
+
+# Function to get the refresh statuses of one batch of checks. The API rejects a
+# batch holding a check that Trusted Advisor refreshes automatically, so a
+# rejected batch is split in halves until the offending checks are isolated.
+def fetch_refresh_status_batch(check_ids, limiter, client):
+    ClientError = lazy_import('botocore.exceptions').ClientError
+    try:
+        response = call_with_backoff(limiter, client.describe_trusted_advisor_check_refresh_statuses, checkIds=check_ids)
+    except ClientError as e:
+        code = e.response['Error']['Code']
+        if code in THROTTLING_ERROR_CODES:
+            raise
+        if len(check_ids) == 1:
+            logger.warning(f"Could not read the refresh status of check {check_ids[0]}: {code}")
+            return {}
+        middle = len(check_ids) // 2
+        statuses = fetch_refresh_status_batch(check_ids[:middle], limiter, client)
+        statuses.update(fetch_refresh_status_batch(check_ids[middle:], limiter, client))
+        return statuses
+    return {status['checkId']: status for status in response['statuses']}
+
+# Function to request a refresh, returning False for checks that cannot be
+# refreshed manually (they are refreshed by Trusted Advisor itself)
+def start_refresh(check_id, limiter, client):
+    ClientError = lazy_import('botocore.exceptions').ClientError
+    try:
+        call_with_backoff(limiter, client.refresh_trusted_advisor_check, checkId=check_id)
+    except ClientError as e:
+        logger.warning(f"Could not refresh check {check_id}: {e.response['Error']['Code']}")
+        return False
+    return True
+
+# Function to refresh the checks and yield them in batches as they become ready
+# to read. Checks still in their refresh cooldown or that cannot be refreshed are
+# yielded first; the rest are yielded as the batched status polls see their
+# refresh finish, so the total wait is that of the slowest check.
+def refresh_checks(check_ids, limiter, client=None):
+    client = client or get_client('support')
+    statuses = fetch_refresh_statuses(check_ids, limiter, client)
+    refreshable = []
+    pending = set()
+    ready = []
+    for check_id in check_ids:
+        status = statuses.get(check_id)
+        if status is None:
+            ready.append(check_id)
+        elif status['status'] in IN_PROGRESS_STATUSES:
+            pending.add(check_id)
+        elif status.get('millisUntilNextRefreshable', 0) == 0:
+            refreshable.append(check_id)
+        else:
+            ready.append(check_id)
+
+    ThreadPoolExecutor = lazy_import('concurrent.futures').ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=max(1, MAX_CONCURRENCY)) as executor:
+        started = list(executor.map(lambda check_id: start_refresh(check_id, limiter, client), refreshable))
+    for check_id, refreshing in zip(refreshable, started):
+        if refreshing:
+            pending.add(check_id)
+        else:
+            ready.append(check_id)
+    if ready:
+        yield ready
+
+    deadline = time.monotonic() + REFRESH_TIMEOUT_SECONDS
+    delay = REFRESH_POLL_SECONDS
+    while pending:
+        if time.monotonic() + delay > deadline:
+            logger.warning(f"{len(pending)} checks did not finish refreshing in {REFRESH_TIMEOUT_SECONDS:.0f} seconds")
+            yield [check_id for check_id in check_ids if check_id in pending]
+            return
+        time.sleep(delay * random.uniform(0.8, 1.2))
+        statuses = fetch_refresh_statuses([check_id for check_id in check_ids if check_id in pending], limiter, client)
+        done = [
+            check_id for check_id in check_ids
+            if check_id in pending and statuses.get(check_id, {}).get('status') not in IN_PROGRESS_STATUSES
+        ]
+        if done:
+            pending.difference_update(done)
+            yield done
+            delay = REFRESH_POLL_SECONDS
+        else:
+            delay = min(REFRESH_MAX_POLL_SECONDS, delay * 1.5)
@@ -0,0 +1,170 @@
+import argparse
+import datetime
+import gzip
+import json
+import logging
+import os
+import sys
+from trusted_advisor import engine
+from trusted_advisor.cache import TieredCache
+from trusted_advisor.reporters import get_reporters
+from trusted_advisor.startup import lazy_import
+
+# Offline record and replay of the Support API. record saves the raw catalog,
+# check summaries and check results of an account as a gzip compressed JSON
+# snapshot; replay renders snapshots into HTML reports with no credentials,
+# spreading them over a process pool for backfills and bulk re-rendering.
+#
+#     python -m trusted_advisor.replay record --output snapshots/ [--organization]
+#     python -m trusted_advisor.replay replay snapshots/ --output reports/ [--workers 8]
+SNAPSHOT_VERSION = 1
+
+logger = logging.getLogger()
+
+# Function to write a snapshot as gzip compressed JSON
+def save_snapshot(path, snapshot):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with gzip.open(path, 'wt', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+
+# Function to read a snapshot written by save_snapshot
+def load_snapshot(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        snapshot = json.load(f)
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"{path} is not a version {SNAPSHOT_VERSION} snapshot")
+    return snapshot
+
+# Function to record the raw Support API responses of one account. Only the
+# checks whose summary calls for a full result are downloaded, as in a report.
+def record_snapshot(client, account_id, categories=engine.CATEGORIES):
+    checks = client.describe_trusted_advisor_checks(language='en')['checks']
+    check_ids = [check['id'] for check in checks if check['category'] in categories]
+    limiter = engine.AdaptiveRateLimiter()
+    summaries = engine.fetch_check_summaries(check_ids, limiter, client)
+    flagged_ids = [check_id for check_id in check_ids if engine.needs_full_result(summaries.get(check_id))]
+    results = engine.fetch_check_results(flagged_ids, limiter, client=client)
+    return {
+        'version': SNAPSHOT_VERSION,
+        'account_id': account_id,
+        'recorded_at': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'checks': checks,
+        'summaries': list(summaries.values()),
+        'results': {check_id: response['result'] for check_id, response in zip(flagged_ids, results)},
+    }
+
+# Support client answering from a recorded snapshot
+class ReplayClient:
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.summaries = {summary['checkId']: summary for summary in snapshot['summaries']}
+
+    def describe_trusted_advisor_checks(self, language='en'):
+        return {'checks': self.snapshot['checks']}
+
+    def describe_trusted_advisor_check_summaries(self, checkIds):
+        return {'summaries': [self.summaries[check_id] for check_id in checkIds if check_id in self.summaries]}
+
+    def describe_trusted_advisor_check_result(self, checkId, language='en'):
+        return {'result': self.snapshot['results'].get(checkId, {'checkId': checkId, 'flaggedResources': []})}
+
+# Function to set up a replay worker: nothing is read from or written to the cache,
+# so every report is rendered from its snapshot alone
+def init_replay_worker():
+    engine.cache = TieredCache([])
+
+# Function to render one snapshot into an HTML report in output_dir.
+# Returns (snapshot path, report path, flagged resources).
+def replay_snapshot(path, output_dir, categories=engine.CATEGORIES):
+    snapshot = load_snapshot(path)
+    client = ReplayClient(snapshot)
+    checks = [check for check in client.describe_trusted_advisor_checks()['checks'] if check['category'] in categories]
+    # Replayed calls are local, so the rate limiter never waits
+    limiter = engine.AdaptiveRateLimiter(rate=float('inf'), max_rate=float('inf'))
+    recommendations = engine.fetch_recommendations(checks, limiter, client, snapshot.get('account_id'))
+    html_table, _ = engine.render_report(get_reporters(categories), checks, recommendations, 'snapshot/replay', full_report=True)
+
+    name = os.path.basename(path)
+    for suffix in ('.gz', '.json'):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    report_path = os.path.join(output_dir, name + '.html')
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write(html_table)
+    return path, report_path, len(recommendations)
+
+# Function to render many snapshots in parallel, one process per core by default.
+# A snapshot that fails is logged and does not stop the others.
+def replay_snapshots(paths, output_dir, categories=engine.CATEGORIES, workers=None):
+    futures_module = lazy_import('concurrent.futures')
+    os.makedirs(output_dir, exist_ok=True)
+    reports = []
+    with futures_module.ProcessPoolExecutor(max_workers=workers, initializer=init_replay_worker) as executor:
+        futures = {executor.submit(replay_snapshot, path, output_dir, categories): path for path in paths}
+        for future in futures_module.as_completed(futures):
+            try:
+                reports.append(future.result())
+            except Exception as e:
+                logger.error(f"Replay of {futures[future]} failed: {e}")
+    return sorted(reports)
+
+# Function to expand directories into the snapshots they contain
+def snapshot_paths(paths):
+    expanded = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, file_names in os.walk(path):
+                expanded.extend(os.path.join(directory, file_name) for file_name in file_names if file_name.endswith('.json.gz'))
+        else:
+            expanded.append(path)
+    return sorted(expanded)
+
+# Function to record the own account, or every member account with organization
+def record(output_dir, categories, organization=False):
+    if organization:
+        organizations = lazy_import('trusted_advisor.organizations')
+        accounts = [account_id for account_id, _ in organizations.list_member_accounts()]
+        client_factory = organizations.assume_support_client
+    else:
+        accounts = [engine.get_client('sts').get_caller_identity()['Account']]
+        client_factory = lambda account_id: engine.get_client('support')
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    paths = []
+    for account_id in accounts:
+        try:
+            snapshot = record_snapshot(client_factory(account_id), account_id, categories)
+        except Exception as e:
+            logger.error(f"Recording failed for account {account_id}: {e}")
+            continue
+        path = os.path.join(output_dir, f"{account_id}-{stamp}.json.gz")
+        save_snapshot(path, snapshot)
+        paths.append(path)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record Trusted Advisor API responses and replay them into HTML reports offline.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record_parser = subparsers.add_parser('record', help="record the Support API responses of an account")
+    record_parser.add_argument('--output', required=True, help="directory for the snapshots")
+    record_parser.add_argument('--organization', action='store_true', help="record every active member account")
+    replay_parser = subparsers.add_parser('replay', help="render snapshots into HTML reports")
+    replay_parser.add_argument('snapshots', nargs='+', help="snapshot files or directories holding them")
+    replay_parser.add_argument('--output', required=True, help="directory for the reports")
+    replay_parser.add_argument('--workers', type=int, help="worker processes, one per core by default")
+    for subparser in (record_parser, replay_parser):
+        subparser.add_argument('--categories', nargs='+', choices=engine.CATEGORIES, default=list(engine.CATEGORIES))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.command == 'record':
+        for path in record(args.output, args.categories, args.organization):
+            print(path)
+        return 0
+    paths = snapshot_paths(args.snapshots)
+    reports = replay_snapshots(paths, args.output, args.categories, args.workers)
+    for _, report_path, resources in reports:
+        print(f"{report_path}\t{resources}")
+    return 0 if len(reports) == len(paths) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import io
+from collections import namedtuple
+from html import escape
+
+# Table layout of a check: the column headers to show and an optional fixed
+# description used instead of the one from the check catalog. Each resource
+# contributes its first len(columns) metadata values.
+CheckLayout = namedtuple('CheckLayout', ['columns', 'description'], defaults=[None])
+
+# Function to stream an HTML table into out, one row at a time
+def write_table(out, columns, rows):
+    width = len(columns)
+    out.write('<table border="1" class="dataframe">\n  <thead>\n    <tr style="text-align: right;">\n')
+    for column in columns:
+        out.write(f'      <th>{escape(column)}</th>\n')
+    out.write('    </tr>\n  </thead>\n  <tbody>\n')
+    for row in rows:
+        out.write('    <tr>\n')
+        for index in range(width):
+            value = row[index] if index < len(row) else ''
+            out.write(f'      <td>{escape(str(value))}</td>\n')
+        out.write('    </tr>\n')
+    out.write('  </tbody>\n</table>')
+
+# Function to format metadata into tabular format
+def format_metadata(metadata, columns):
+    out = io.StringIO()
+    write_table(out, columns, metadata)
+    return out.getvalue()
+
+def extract_description(html_content):
+    import re
+    # Use a regular expression to find the content up to "Alert Criteria"
+    match = re.search(r'(.*?)<h4 class=\'headerBodyStyle\'>Alert Criteria</h4>', html_content, re.DOTALL)
+    if match:
+        return match.group(1).strip()
+    else:
+        return None
+
+# Function to render the resources resolved since the previous run
+def render_resolved(resolved, check_names, out):
+    out.write("<h2>Resolved since the last run</h2>")
+    write_table(
+        out,
+        ['Category', 'Check', 'Resource ID', 'Previous Status'],
+        ([category, check_names.get(check_id, check_id), resource_id, status] for check_id, resource_id, category, status in resolved)
+    )
+
+# Base reporter. Each reporter owns one Trusted Advisor category and renders the
+# checks of that category from recommendations grouped by check name. Reporters
+# with a layouts registry only render the checks listed there; the others render
+# every check with the column names from the check catalog.
+class CategoryReporter:
+    category = None
+    title = None
+    layouts = None
+    show_description = False
+
+    def render(self, grouped_recommendations, out):
+        out.write(f"<h2>{self.title}</h2>")
+        for check_name, recs in grouped_recommendations.items():
+            self.render_check(check_name, recs, out)
+
+    def get_layout(self, check_name, recs):
+        if self.layouts is None:
+            return CheckLayout(recs[0].columns) if recs[0].columns else None
+        return self.layouts.get(check_name)
+
+    def render_check(self, check_name, recs, out):
+        layout = self.get_layout(check_name, recs)
+        if layout is None:
+            return
+        out.write(f"<h3>{escape(check_name)}</h3>")
+        description = layout.description
+        if description is None and self.show_description:
+            description = recs[0].check.summary()
+        if description:
+            out.write(f"<p>{description}</p>")
+        if self.layouts is None:
+            # Catalog columns match the metadata by position, so missing (None)
+            # values are kept as empty cells
+            rows = (['' if item is None else item for item in rec.metadata] for rec in recs)
+        else:
+            # Missing (None) metadata values are left out of the row
+            rows = ([item for item in rec.metadata if item is not None] for rec in recs)
+        if recs[0].change is not None:
+            # Delta report: lead each row with whether the resource is new or changed
+            width = len(layout.columns)
+            rows = ([rec.change] + row[:width] for rec, row in zip(recs, rows))
+            write_table(out, ['Change'] + layout.columns, rows)
+        else:
+            write_table(out, layout.columns, rows)
+
+class CostOptimizationReporter(CategoryReporter):
+    category = 'cost_optimizing'
+    title = "AWS Trusted Advisor Cost Optimization Recommendations"
+    show_description = True
+    layouts = {
+        'Idle Load Balancers': CheckLayout(['region', 'load balancer name', 'reason', 'estimated monthly savings']),
+        'Amazon RDS Idle DB Instances': CheckLayout(['region', 'DB Instance name', 'Multi AZ', 'Instance type', 'Stored Provisioned(GB)', 'Days since last connection', 'estimated monthly savings']),
+        'Low Utilization Amazon EC2 Instances': CheckLayout(['Region/AZ', 'Instance ID', 'Instance Name', 'Instance Type', 'Estimated Monthly Savings']),
+        'Underutilized Amazon EBS Volumes': CheckLayout(['Region', 'Volume ID', 'Volume Name', 'Volume Type', 'Volume Size', 'Monthly Storage Cost']),
+        'AWS Lambda Functions with Excessive Timeouts': CheckLayout(['Status', 'Region', 'Function ARN']),
+        'AWS Lambda Functions with High Error Rates': CheckLayout(['Status', 'Region', 'Function ARN']),
+        'Amazon EBS over-provisioned volumes': CheckLayout(['Status', 'Region', 'Volume ID', 'Volume Type', 'Volume Size(GB)']),
+        'Amazon EC2 instances consolidation for Microsoft SQL Server': CheckLayout(['Status', 'Region', 'Instance ID', 'Instance Type']),
+        'Amazon EC2 instances over-provisioned for Microsoft SQL Server': CheckLayout(['Status', 'Region', 'Instance ID', 'Instance Type']),
+        'AWS Lambda over-provisioned functions for memory size': CheckLayout(['Status', 'Region', 'Function Name']),
+        'Amazon Route 53 Latency Resource Record Sets': CheckLayout(['Hosted Zone Name', 'Hosted Zone ID']),
+        'Amazon EC2 Reserved Instance Lease Expiration': CheckLayout(['Status', 'Zone', 'Instance Type', 'Platform', 'Instance Count', 'Current Monthly Cost', 'Estimated Monthly Savings']),
+        'Amazon Comprehend Underutilized Endpoints': CheckLayout(['Status', 'Region', 'Endpoint ARN']),
+        'Unassociated Elastic IP Addresses': CheckLayout(['Region', 'IP Address']),
+        'Underutilized Amazon Redshift Clusters': CheckLayout(['Status', 'Region', 'Cluster', 'Instance Type', 'Reason', 'Estimated Monthly Savings']),
+        'Inactive AWS Network Firewall': CheckLayout(['Status', 'Region', 'Network Firewall Arn', 'VPC ID']),
+        'Inactive NAT Gateways': CheckLayout(
+            ['Status', 'Region', 'NAT Gateway ID', 'Subnet ID', 'VPC ID'],
+            "Checks your NAT Gateways for any gateways that appear to be inactive. A NAT Gateway is considered to be inactive if it had no data processed in the last 30 days.  NAT Gateways have hourly charges and data processed charges.  This check alerts you to NAT Gateway with 0  data processed in the last 30 days."
+        ),
+    }
+
+class SecurityReporter(CategoryReporter):
+    category = 'security'
+    title = "AWS Trusted Advisor Security Recommendations"
+    layouts = {
+        'Amazon EC2 instances with Microsoft Windows Server end of support': CheckLayout(['Status', 'Region', 'Instance ID', 'Windows Server Version', 'Support Cycle', 'End of Support']),
+        'Amazon EC2 instances with Ubuntu LTS end of standard support': CheckLayout(['Status', 'Region', 'Ubuntu Lts Version', 'Expected End Of Support Date', 'Instance Id', 'Support Cycle']),
+        'Amazon RDS storage encryption is turned off': CheckLayout(['Status', 'Region', 'Resource', 'Engine Name']),
+        'AWS Lambda Functions Using Deprecated Runtimes': CheckLayout(['Status', 'Region', 'Function ARN', 'Runtime', 'Days to Deprecation', 'Deprecation Date', 'Average Daily Invokes']),
+        'ELB Listener Security': CheckLayout(['Region', 'Load Balancer Name']),
+        # 'Security Groups - Specific Ports Unrestricted': CheckLayout(['Region', 'Security Group Name', 'Security Group ID', 'Protocol']),
+        # 'Security Groups - Unrestricted Access': CheckLayout(['Region', 'Security Group Name', 'Security Group ID', 'Protocol']),
+        'Amazon S3 Bucket Permissions': CheckLayout(['Region', 'Region API Parameter', 'Bucket Name', 'ACL Allows List', 'ACL Allows Upload/Delete', 'Status', 'Policy Allows Access']),
+        'Amazon EBS Public Snapshots': CheckLayout(['Status', 'Region', 'Volume ID', 'Snapshot ID']),
+        'Amazon EC2 instances with Microsoft SQL Server end of support': CheckLayout(['Status', 'Region', 'Instance ID', 'SQL Server Version', 'Support Cycle', 'End of Support']),
+        'Amazon RDS Aurora storage encryption is turned off': CheckLayout(['Status', 'Region', 'Resource', 'Engine Name']),
+        'Amazon RDS Public Snapshots': CheckLayout(['Status', 'Region', 'DB Instance or Cluster ID', 'Snapshot ID']),
+        'A WAF global rule group should have at least one rule': CheckLayout(['Status', 'Region', 'Resource']),
+        'Amazon DocumentDB clusters should be encrypted at rest': CheckLayout(['Status', 'Region', 'Resource']),
+        'Amazon EC2 instances launched using Auto Scaling group launch configurations should not have Public IP addresses': CheckLayout(['Status', 'Region', 'Resource']),
+        'ACM certificates should be renewed after a specified time period': CheckLayout(['Status', 'Region', 'Resource']),
+        'Amazon DocumentDB manual cluster snapshots should not be public': CheckLayout(['Status', 'Region', 'Resource']),
+    }
+
+class FaultToleranceReporter(CategoryReporter):
+    category = 'fault_tolerance'
+    title = "AWS Trusted Advisor Fault Tolerance Recommendations"
+
+class PerformanceReporter(CategoryReporter):
+    category = 'performance'
+    title = "AWS Trusted Advisor Performance Recommendations"
+
+class ServiceLimitsReporter(CategoryReporter):
+    category = 'service_limits'
+    title = "AWS Trusted Advisor Service Limits Recommendations"
+
+# Reporter classes keyed by Trusted Advisor category
+REPORTERS = {
+    reporter.category: reporter
+    for reporter in (CostOptimizationReporter, SecurityReporter, FaultToleranceReporter, PerformanceReporter, ServiceLimitsReporter)
+}
+
+# Function to build reporters for the requested categories
+def get_reporters(categories):
+    return [REPORTERS[category]() for category in categories]
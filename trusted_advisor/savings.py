@@ -0,0 +1,114 @@
+import heapq
+import itertools
+import os
+from trusted_advisor.export import COST_COLUMNS, SAVINGS_COLUMNS, column_index, metadata_values, parse_money_values
+from trusted_advisor.reporters import write_table
+
+# The report opens with a savings summary: the total estimated monthly savings,
+# the SAVINGS_TOP_N resources with the largest savings and the totals per check,
+# region and (in organization mode) account. Money columns sit at a different
+# metadata position in each check, so positions are looked up once per check
+# rather than once per resource.
+SAVINGS_SUMMARY = os.environ.get('SAVINGS_SUMMARY', 'true').lower() in ('1', 'true', 'yes')
+SAVINGS_TOP_N = int(os.environ.get('SAVINGS_TOP_N', '10'))
+
+# Check catalog columns left out of a resource's label in the top resources table
+LABEL_SKIP_COLUMNS = ('status', 'region', 'region/az', 'zone') + SAVINGS_COLUMNS + COST_COLUMNS
+
+# Function to collect the resources of checks with a savings or cost column.
+# Returns the resources and their savings and current costs (None when absent).
+def collect_amounts(recommendations):
+    resources = []
+    savings = []
+    costs = []
+    # Resources arrive in check order, so each check's resources are contiguous
+    for check, recs in itertools.groupby(recommendations, key=lambda rec: rec.check):
+        savings_index = column_index(check.columns, SAVINGS_COLUMNS)
+        cost_index = column_index(check.columns, COST_COLUMNS)
+        if savings_index is None and cost_index is None:
+            continue
+        recs = list(recs)
+        resources.extend(recs)
+        savings.extend(metadata_values(recs, savings_index))
+        costs.extend(metadata_values(recs, cost_index))
+    return resources, parse_money_values(savings), parse_money_values(costs)
+
+# Function to add amount to totals[key], ignoring missing amounts
+def add_amount(totals, key, amount):
+    if amount is not None:
+        totals[key] = totals.get(key, 0.0) + amount
+
+# Function to compute the savings totals of a set of recommendations. Returns
+# None when no resource has a savings or cost amount.
+def summarize_savings(recommendations, top_n=SAVINGS_TOP_N):
+    resources, savings, costs = collect_amounts(recommendations)
+    if not any(amount is not None for amount in itertools.chain(savings, costs)):
+        return None
+
+    by_check = {}
+    by_region = {}
+    by_account = {}
+    check_costs = {}
+    check_counts = {}
+    for rec, saving, cost in zip(resources, savings, costs):
+        add_amount(by_check, rec.check_name, saving)
+        add_amount(by_region, rec.region or 'global', saving)
+        add_amount(by_account, rec.account_id, saving)
+        add_amount(check_costs, rec.check_name, cost)
+        check_counts[rec.check_name] = check_counts.get(rec.check_name, 0) + 1
+
+    # Heap selection keeps this O(n log top_n) instead of sorting every resource
+    candidates = [index for index, saving in enumerate(savings) if saving is not None and saving > 0]
+    top = heapq.nlargest(top_n, candidates, key=savings.__getitem__)
+    return {
+        'total': sum(by_check.values()),
+        'resources': len(candidates),
+        'top': [(resources[index], savings[index]) for index in top],
+        'by_check': [
+            (name, check_counts[name], by_check.get(name), check_costs.get(name))
+            for name in sorted(check_counts, key=lambda name: -(by_check.get(name) or 0.0))
+        ],
+        'by_region': sorted(by_region.items(), key=lambda item: -item[1]),
+        'by_account': sorted(((account_id, amount) for account_id, amount in by_account.items() if account_id), key=lambda item: -item[1]),
+    }
+
+# Function to format an amount of money
+def format_money(amount):
+    return '' if amount is None else f"${amount:,.2f}"
+
+# Function to label a resource with its identifying metadata values
+def resource_label(rec):
+    values = [
+        value for column, value in zip(rec.columns, rec.metadata)
+        if value and column.lower() not in LABEL_SKIP_COLUMNS
+    ]
+    return ' / '.join(values[:2]) or rec.resource_id
+
+# Function to render the savings summary into out, or nothing without savings data
+def render_savings(recommendations, out, top_n=SAVINGS_TOP_N):
+    summary = summarize_savings(recommendations, top_n)
+    if summary is None:
+        return None
+    by_account = summary['by_account']
+    out.write("<h2>Savings Summary</h2>")
+    out.write(f"<p>Estimated monthly savings: {format_money(summary['total'])} across {summary['resources']} resources.</p>")
+    if summary['top']:
+        out.write(f"<h4>Top {len(summary['top'])} resources by estimated monthly savings</h4>")
+        columns = ['Check', 'Region', 'Resource', 'Estimated Monthly Savings']
+        rows = ([rec.check_name, rec.region or '', resource_label(rec), format_money(saving)] for rec, saving in summary['top'])
+        if by_account:
+            columns = ['Account'] + columns
+            rows = ([rec.account_id or ''] + row for (rec, _), row in zip(summary['top'], rows))
+        write_table(out, columns, rows)
+    out.write("<h4>By check</h4>")
+    write_table(
+        out,
+        ['Check', 'Resources', 'Estimated Monthly Savings', 'Current Monthly Cost'],
+        ([name, count, format_money(saving), format_money(cost)] for name, count, saving, cost in summary['by_check'])
+    )
+    out.write("<h4>By region</h4>")
+    write_table(out, ['Region', 'Estimated Monthly Savings'], ([region, format_money(amount)] for region, amount in summary['by_region']))
+    if by_account:
+        out.write("<h4>By account</h4>")
+        write_table(out, ['Account', 'Estimated Monthly Savings'], ([account_id, format_money(amount)] for account_id, amount in by_account))
+    return summary
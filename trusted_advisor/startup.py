@@ -0,0 +1,49 @@
+import importlib
+import json
+import logging
+import os
+import sys
+import time
+
+# Set PROFILE_STARTUP=1 to log how long each deferred import and AWS client
+# initialisation took on a cold start. COLD_START_BUDGET_MS turns the report
+# into a warning when the total goes over the budget.
+PROFILE_STARTUP = os.environ.get('PROFILE_STARTUP', '').lower() in ('1', 'true', 'yes')
+COLD_START_BUDGET_MS = float(os.environ.get('COLD_START_BUDGET_MS', '0'))
+
+logger = logging.getLogger()
+
+# (kind, name, milliseconds) for every import and client created in this process
+timings = []
+reported = False
+
+# Function to record the time spent since start under the given kind and name
+def record(kind, name, start):
+    if PROFILE_STARTUP:
+        timings.append((kind, name, (time.perf_counter() - start) * 1000))
+
+# Function to import a module on first use, timing the import when profiling.
+# Always goes through importlib, whose import lock makes a thread wait for a
+# module another thread is still importing instead of getting it half built.
+def lazy_import(name):
+    loaded = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if not loaded:
+        record('import', name, start)
+    return module
+
+# Function to log the startup timings once per process
+def report_startup():
+    global reported
+    if not PROFILE_STARTUP or reported:
+        return
+    reported = True
+    total_ms = sum(ms for _, _, ms in timings)
+    logger.info(json.dumps({
+        'startup': [{'kind': kind, 'name': name, 'ms': round(ms, 2)} for kind, name, ms in timings],
+        'total_ms': round(total_ms, 2),
+        'budget_ms': COLD_START_BUDGET_MS
+    }))
+    if COLD_START_BUDGET_MS and total_ms > COLD_START_BUDGET_MS:
+        logger.warning(f"Cold start took {total_ms:.0f} ms, over the {COLD_START_BUDGET_MS:.0f} ms budget")